@@ -3,27 +3,22 @@ import streamlit as st
 import pandas as pd
 import json
 import re
-import os
 from datetime import datetime
 import hashlib # 用于密码哈希
+from auth_store import create_backend
+from jsonld_flatten import flatten_to_frames, frame_to_parquet_bytes
 
-USER_FILE = "users.json"
+# set_page_config 必须是第一个 Streamlit 命令，需在创建后端等任何输出之前调用
+st.set_page_config(page_title="结构化数据助手", layout="wide")
 
-# ----------------- 用户持久化加载 -----------------
-def load_user_db():
-    if os.path.exists(USER_FILE):
-        with open(USER_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    else:
-        # 初始用户 Eric 的密码也应是哈希过的
-        # 假设 '1314' 的 SHA-256 哈希值
-        initial_hashed_password = hashlib.sha256("1314".encode()).hexdigest()
-        return {"Eric": {"password": initial_hashed_password, "is_admin": True}}
+# ----------------- 共享用户 / 会话后端 -----------------
+# 每个进程只创建一次；用户和会话存于共享存储，所有进程看到相同的登录状态和用户数据。
+# 注意：Streamlit 的 websocket、上传和下载文件仍保存在单个进程内存中，负载均衡需保持每个连接的会话亲和性
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    return create_backend()
 
-# ----------------- 用户持久化保存 -----------------
-def save_user_db(user_db):
-    with open(USER_FILE, "w", encoding="utf-8") as f:
-        json.dump(user_db, f, ensure_ascii=False, indent=2)
+backend = get_backend()
 
 # ----------------- 密码哈希函数 -----------------
 def hash_password(password):
@@ -31,8 +26,6 @@ def hash_password(password):
 
 # ----------------- 初始化 -----------------
 def init_user_db():
-    if "user_db" not in st.session_state:
-        st.session_state.user_db = load_user_db()
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
     if "username" not in st.session_state:
@@ -43,10 +36,28 @@ def init_user_db():
         st.session_state.ai_prompt_to_copy = ""
 
 init_user_db()
-user_db = st.session_state.user_db
+# 每次运行都从共享存储读取，其他进程中的后台改动立即可见
+user_db = backend.load_users()
+
+# ----------------- 会话恢复 -----------------
+# 签名令牌保存在 URL 参数中，新连接（刷新、新标签页）落到任意进程都能据此恢复登录状态。
+# 每次登录一个令牌，退出登录、重置密码或删除用户时失效
+session_token = st.query_params.get("sid", "")
+if session_token:
+    restored_user = backend.resolve_session(session_token)
+    if restored_user in user_db:
+        st.session_state.username = restored_user
+        st.session_state.authenticated = True
+    else:
+        # 令牌失效、过期或用户已被删除
+        st.session_state.authenticated = False
+        st.session_state.username = ""
+        del st.query_params["sid"]
+elif st.session_state.authenticated and st.session_state.username not in user_db:
+    st.session_state.authenticated = False
+    st.session_state.username = ""
 
 # ----------------- 页面配置 -----------------
-st.set_page_config(page_title="结构化数据助手", layout="wide")
 st.markdown("""
 <style>
 h1, .stTitle {text-align: center;}
@@ -84,6 +95,7 @@ if not st.session_state.authenticated:
             if username in user_db and user_db[username]["password"] == hash_password(password):
                 st.session_state.username = username
                 st.session_state.authenticated = True
+                st.query_params["sid"] = backend.create_session(username)
                 st.rerun()
             else:
                 st.error("用户名或密码错误")
@@ -91,6 +103,12 @@ if not st.session_state.authenticated:
 
 # ----------------- 页面导航 -----------------
 st.sidebar.markdown("## 📂 功能导航")
+if st.sidebar.button("退出登录"):
+    backend.revoke_session(st.query_params.get("sid", ""))
+    st.query_params.clear()
+    st.session_state.authenticated = False
+    st.session_state.username = ""
+    st.rerun()
 page = st.sidebar.radio("请选择功能模块：", ["首页", "结构化生成器", "管理后台", "JSON-LD 对比", "解析诊断", "外部资源", "高级功能"]) # 新增页面
 
 # ----------------- 首页 -----------------
@@ -139,8 +157,7 @@ elif page == "管理后台":
         if new_user in user_db:
             st.warning("该用户已存在")
         elif new_user and new_pass:
-            user_db[new_user] = {"password": hash_password(new_pass), "is_admin": is_admin}
-            save_user_db(user_db)
+            backend.put_user(new_user, hash_password(new_pass), is_admin)
             st.success("用户添加成功！")
             st.experimental_rerun()
         else:
@@ -155,8 +172,9 @@ elif page == "管理后台":
         new_password_for_reset = st.text_input("新密码", type="password", key="new_password_reset_input")
         if st.button("重置密码"):
             if reset_user and new_password_for_reset:
-                user_db[reset_user]["password"] = hash_password(new_password_for_reset)
-                save_user_db(user_db)
+                backend.put_user(reset_user, hash_password(new_password_for_reset), user_db[reset_user]["is_admin"])
+                # 旧密码下签发的会话在所有进程中一并失效
+                backend.revoke_user_sessions(reset_user)
                 st.success(f"用户 `{reset_user}` 的密码已更新！")
                 st.experimental_rerun()
             else:
@@ -171,8 +189,7 @@ elif page == "管理后台":
         delete_user = st.selectbox("选择要删除的用户", deletable_users, key="delete_user_select")
         if st.button("删除用户", key="delete_user_btn"):
             if delete_user:
-                del user_db[delete_user]
-                save_user_db(user_db)
+                backend.delete_user(delete_user)
                 st.success(f"用户 `{delete_user}` 已删除！")
                 st.experimental_rerun()
             else:
@@ -694,4 +711,48 @@ elif page == "高级功能":
             except json.JSONDecodeError:
                 st.error("JSON 格式错误，无法提取字段。")
             except Exception as e:
-                st.error(f"提取字段时发生错误: {e}")
\ No newline at end of file
+                st.error(f"提取字段时发生错误: {e}")
+
+    st.markdown("---")
+    st.subheader("JSON-LD 批量展平")
+    st.write("上传多个 JSON-LD 文件（.json 或每行一个文档的 .jsonl），按实体展平为表格：每个实体一行，每个字段路径一列，`mainEntity`、`offers` 等数组拆分为子表。大规模语料请使用命令行 `python jsonld_flatten.py 输入文件 -o 输出目录` 增量写入 Parquet。")
+    uploaded_files = st.file_uploader("上传 JSON-LD 文件", type=["json", "jsonl"], accept_multiple_files=True, key="flatten_files_upload")
+
+    # 展平结果保存在 session_state 中：点击下载按钮会触发重新运行，结果不能只在按钮分支内显示
+    uploaded_signature = [(uploaded.name, uploaded.size) for uploaded in uploaded_files or []]
+    if st.session_state.get("flattened_signature") != uploaded_signature:
+        st.session_state.flattened_tables = None
+
+    if uploaded_files and st.button("展平数据", key="flatten_btn"):
+        try:
+            documents = []
+            for uploaded in uploaded_files:
+                content = uploaded.getvalue().decode("utf-8")
+                if uploaded.name.endswith(".jsonl"):
+                    documents.extend(json.loads(line) for line in content.splitlines() if line.strip())
+                else:
+                    documents.append(json.loads(content))
+
+            frames = flatten_to_frames(documents)
+            st.session_state.flattened_tables = {
+                table_name: (frame, frame_to_parquet_bytes(frame)) for table_name, frame in frames.items()
+            }
+            st.session_state.flattened_signature = uploaded_signature
+        except json.JSONDecodeError:
+            st.error("JSON 格式错误，无法展平。")
+        except Exception as e:
+            st.error(f"展平数据时发生错误: {e}")
+
+    flattened_tables = st.session_state.get("flattened_tables")
+    if flattened_tables is not None:
+        if not flattened_tables:
+            st.info("未找到可展平的实体。")
+        for table_name, (frame, parquet_bytes) in flattened_tables.items():
+            st.markdown(f"#### 表 `{table_name}`（{len(frame)} 行）")
+            st.dataframe(frame, use_container_width=True)
+            st.download_button(
+                f"📥 下载 {table_name}.parquet",
+                parquet_bytes,
+                file_name=f"{table_name}.parquet",
+                key=f"download_{table_name}_parquet",
+            )
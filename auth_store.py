@@ -0,0 +1,256 @@
+# auth_store.py
+# 多进程共享的用户 / 会话存储：签名会话令牌 + 可插拔后端（内存 / SQLite）
+import os
+import json
+import time
+import hmac
+import base64
+import hashlib
+import secrets
+import sqlite3
+import threading
+
+USER_FILE = "users.json"
+SESSION_TTL = int(os.environ.get("SESSION_TTL", 8 * 3600))  # 会话有效期（秒），令牌在 URL 中可见，默认取较短的 8 小时
+
+
+# ----------------- 初始用户 -----------------
+def default_user_db():
+    # 优先沿用旧版 users.json，便于从单进程版本平滑迁移
+    if os.path.exists(USER_FILE):
+        with open(USER_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    # 初始用户 Eric，密码 '1314' 的 SHA-256 哈希值
+    initial_hashed_password = hashlib.sha256("1314".encode()).hexdigest()
+    return {"Eric": {"password": initial_hashed_password, "is_admin": True}}
+
+
+# ----------------- 会话令牌签名 -----------------
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def sign_token(secret, session_id):
+    sig = hmac.new(secret.encode(), session_id.encode(), hashlib.sha256).digest()
+    return f"{session_id}.{_b64encode(sig)}"
+
+
+def verify_token(secret, token):
+    """校验令牌签名，成功返回 session_id，否则返回 None。"""
+    if not token or token.count(".") != 1:
+        return None
+    session_id, sig = token.split(".")
+    try:
+        given = _b64decode(sig)
+    except ValueError:
+        return None
+    expected = hmac.new(secret.encode(), session_id.encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(given, expected):
+        return None
+    return session_id
+
+
+# ----------------- 后端基类 -----------------
+class SessionBackend:
+    """用户与会话存储接口。所有 Streamlit 进程通过同一后端读写，登录状态和后台改动即可跨进程可见。"""
+
+    def get_secret(self):
+        raise NotImplementedError
+
+    def load_users(self):
+        raise NotImplementedError
+
+    def put_user(self, username, password_hash, is_admin):
+        raise NotImplementedError
+
+    def delete_user(self, username):
+        raise NotImplementedError
+
+    def revoke_user_sessions(self, username):
+        """使该用户的全部会话失效，用于重置密码等场景。"""
+        raise NotImplementedError
+
+    def _put_session(self, session_id, username, expires_at):
+        raise NotImplementedError
+
+    def _get_session(self, session_id):
+        """返回 (username, expires_at)，不存在时返回 None。"""
+        raise NotImplementedError
+
+    def _delete_session(self, session_id):
+        raise NotImplementedError
+
+    # ----- 基于上述原语的通用逻辑 -----
+    def create_session(self, username, ttl=SESSION_TTL):
+        session_id = secrets.token_urlsafe(24)
+        self._put_session(session_id, username, time.time() + ttl)
+        return sign_token(self.get_secret(), session_id)
+
+    def resolve_session(self, token):
+        """令牌有效且未过期时返回用户名，否则返回 None。"""
+        session_id = verify_token(self.get_secret(), token)
+        if session_id is None:
+            return None
+        record = self._get_session(session_id)
+        if record is None:
+            return None
+        username, expires_at = record
+        if expires_at < time.time():
+            self._delete_session(session_id)
+            return None
+        return username
+
+    def revoke_session(self, token):
+        session_id = verify_token(self.get_secret(), token)
+        if session_id is not None:
+            self._delete_session(session_id)
+
+
+# ----------------- 内存后端（单进程 / 本地调试） -----------------
+class MemoryBackend(SessionBackend):
+    def __init__(self, secret=None):
+        self._secret = secret or secrets.token_urlsafe(32)
+        self._lock = threading.Lock()
+        self._users = default_user_db()
+        self._sessions = {}
+
+    def get_secret(self):
+        return self._secret
+
+    def load_users(self):
+        with self._lock:
+            return {k: dict(v) for k, v in self._users.items()}
+
+    def put_user(self, username, password_hash, is_admin):
+        with self._lock:
+            self._users[username] = {"password": password_hash, "is_admin": bool(is_admin)}
+
+    def delete_user(self, username):
+        with self._lock:
+            self._users.pop(username, None)
+        self.revoke_user_sessions(username)
+
+    def revoke_user_sessions(self, username):
+        with self._lock:
+            self._sessions = {k: v for k, v in self._sessions.items() if v[0] != username}
+
+    def _put_session(self, session_id, username, expires_at):
+        with self._lock:
+            self._sessions[session_id] = (username, expires_at)
+
+    def _get_session(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _delete_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# ----------------- SQLite 后端（多进程共享） -----------------
+class SQLiteBackend(SessionBackend):
+    def __init__(self, path, secret=None):
+        self.path = path
+        self._secret = secret
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, password TEXT NOT NULL, is_admin INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, username TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # 多个进程同时启动时，INSERT OR IGNORE 保证只有第一个写入的密钥生效
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('secret', ?)",
+                (secrets.token_urlsafe(32),),
+            )
+            if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, password, is_admin) VALUES (?, ?, ?)",
+                    [(k, v["password"], int(v["is_admin"])) for k, v in default_user_db().items()],
+                )
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+        if self._secret is None:
+            with self._connect() as conn:
+                self._secret = conn.execute("SELECT value FROM meta WHERE key = 'secret'").fetchone()[0]
+
+    def _connect(self):
+        # 每次操作新建连接，避免 Streamlit 多线程共享同一连接
+        return _closing_connection(sqlite3.connect(self.path, timeout=30))
+
+    def get_secret(self):
+        return self._secret
+
+    def load_users(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT username, password, is_admin FROM users").fetchall()
+        return {u: {"password": p, "is_admin": bool(a)} for u, p, a in rows}
+
+    def put_user(self, username, password_hash, is_admin):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO users (username, password, is_admin) VALUES (?, ?, ?)",
+                (username, password_hash, int(bool(is_admin))),
+            )
+
+    def delete_user(self, username):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            conn.execute("DELETE FROM sessions WHERE username = ?", (username,))
+
+    def revoke_user_sessions(self, username):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE username = ?", (username,))
+
+    def _put_session(self, session_id, username, expires_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, username, expires_at) VALUES (?, ?, ?)",
+                (session_id, username, expires_at),
+            )
+
+    def _get_session(self, session_id):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT username, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
+    def _delete_session(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class _closing_connection:
+    """sqlite3 连接的 with 语句只负责提交事务，这里额外保证连接被关闭。"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        try:
+            return self.conn.__exit__(*exc)
+        finally:
+            self.conn.close()
+
+
+# ----------------- 后端选择 -----------------
+def create_backend():
+    """按环境变量选择后端：SESSION_BACKEND=sqlite（默认）| memory，SESSION_DB 指定 SQLite 文件路径。"""
+    kind = os.environ.get("SESSION_BACKEND", "sqlite").lower()
+    secret = os.environ.get("SESSION_SECRET") or None
+    if kind == "memory":
+        return MemoryBackend(secret)
+    if kind == "sqlite":
+        return SQLiteBackend(os.environ.get("SESSION_DB", "sessions.db"), secret)
+    raise ValueError(f"未知的 SESSION_BACKEND: {kind}")
@@ -0,0 +1,382 @@
+# jsonld_flatten.py
+# 将 JSON-LD 文档流展平为列式表：每个实体一行，每个规范化路径一列，数组拆分为子表，
+# 并按行组增量写入 Parquet，便于用 pandas 对海量实体做向量化分析。
+#
+# 列类型规则：
+# - @type 总是 list<string>，单个类型也包装成列表，用 has_type() 按类型筛选；
+# - NUMERIC_KEYS 中的字段（price、ratingValue 等）总是 float64，字符串形式的数字会被解析，
+#   无法解析的原始值写入同名的 "<列名>#text" 列；
+# - 其余字段同一列出现不同类型（如数字和字符串混用）时整列退化为字符串。
+import os
+import re
+import math
+import io
+import json
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ENTITY_TABLE = "entities"
+# 这些字段即使只有单个对象也统一拆为子表，保证不同文档的同一字段落在同一张表里
+CHILD_KEYS = ("mainEntity", "offers", "review", "itemListElement")
+# Schema.org 中常以字符串形式出现的数值字段，统一解析为数字以便向量化计算
+NUMERIC_KEYS = ("price", "lowPrice", "highPrice", "ratingValue", "bestRating", "worstRating",
+                "ratingCount", "reviewCount", "offerCount")
+TEXT_SUFFIX = "#text"
+# schema.org 的前缀写法（schema:name）和完整 IRI（http://schema.org/name）统一为本地名 name
+SCHEMA_PREFIX = re.compile(r"^(?:https?://(?:www\.)?schema\.org/|schema:)")
+ROW_GROUP_SIZE = 50_000
+
+# 元数据列：_id 为本表行号，_doc 为文档序号，_root_id 指向 entities._id，_parent_id 指向父表 _id
+META_TYPES = {
+    "_id": pa.int64(),
+    "_doc": pa.int64(),
+    "_root_id": pa.int64(),
+    "_parent_id": pa.int64(),
+    "_index": pa.int64(),
+}
+KIND_TYPES = {
+    "bool": pa.bool_(),
+    "number": pa.float64(),
+    "str": pa.string(),
+    "list": pa.list_(pa.string()),
+}
+
+
+# ----------------- 文档读取 -----------------
+def iter_entities(doc):
+    """一个文档可以是单个对象、对象数组或带 @graph 的容器，逐个产出其中的实体。"""
+    if isinstance(doc, str):
+        doc = json.loads(doc)
+    if isinstance(doc, list):
+        for item in doc:
+            yield from iter_entities(item)
+    elif isinstance(doc, dict):
+        if isinstance(doc.get("@graph"), list):
+            yield from iter_entities(doc["@graph"])
+        else:
+            yield doc
+
+
+def iter_documents(path):
+    """逐个读取文件中的文档：.jsonl 每行一个文档，其余按单个 JSON 文件处理。"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield json.load(f)
+
+
+# ----------------- 单值类型 -----------------
+def _kind(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, list):
+        return "list"
+    return "str"
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if _kind(value) == "number":
+        # 数字按 float64 存储后的形式输出，早期分片中已落盘的数字列退化为字符串时结果一致，与行组划分无关
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _to_number(value):
+    """解析数值字段，无法解析时返回 None。"""
+    if _kind(value) == "number":
+        return float(value)
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return None
+        if math.isfinite(number):
+            return number
+    return None
+
+
+# ----------------- 路径规范化 -----------------
+def normalize_key(key):
+    return SCHEMA_PREFIX.sub("", key)
+
+
+def table_name(path):
+    """子表名同时用作目录名，把路径分隔符、冒号等不能出现在文件名中的字符替换为下划线。"""
+    name = re.sub(r"[^\w.@-]", "_", path)
+    if not name.strip("."):
+        # 空名以及 "." / ".." 会指向输出目录本身或其上级目录
+        name = "_" + name.replace(".", "_")
+    return name
+
+
+def table_dir(out_dir, table):
+    """返回表所在目录，确保它是 out_dir 的直接子目录。"""
+    directory = os.path.join(out_dir, table)
+    if table != table_name(table) or os.path.dirname(os.path.normpath(directory)) != os.path.normpath(out_dir):
+        raise ValueError(f"非法的表名: {table!r}")
+    return directory
+
+
+# ----------------- 展平 -----------------
+class Flattener:
+    """把实体拆成各表的行，行先缓存在内存中，由调用方按行组取走。"""
+
+    def __init__(self, child_keys=CHILD_KEYS):
+        self.child_keys = set(child_keys)
+        self.buffers = {}
+        self.counters = {}
+        self.doc_count = 0
+        # 表名 -> 原始路径；根表名预留，子表不能与之重名
+        self.tables = {ENTITY_TABLE: ""}
+        self._path_tables = {}
+        self._table_keys = {ENTITY_TABLE.lower()}
+
+    def _child_table(self, path):
+        """为子表路径分配表名。清洗后重名（如 a/b 与 a:b），或在不区分大小写的文件系统上重名（Offers 与 offers）时追加 __2、__3 等后缀。"""
+        name = self._path_tables.get(path)
+        if name is None:
+            base = name = table_name(path)
+            suffix = 1
+            while name.lower() in self._table_keys:
+                suffix += 1
+                name = f"{base}__{suffix}"
+            self._path_tables[path] = name
+            self._table_keys.add(name.lower())
+            self.tables[name] = path
+        return name
+
+    def _new_row(self, table, meta):
+        row_id = self.counters.get(table, 0)
+        self.counters[table] = row_id + 1
+        row = {"_id": row_id, **meta}
+        self.buffers.setdefault(table, []).append(row)
+        return row
+
+    def add_document(self, doc):
+        for entity in iter_entities(doc):
+            row = self._new_row(ENTITY_TABLE, {"_doc": self.doc_count})
+            self._flatten(entity, "", row, "", row["_id"])
+        self.doc_count += 1
+
+    def _flatten(self, obj, prefix, row, table_path, root_id):
+        for key, value in obj.items():
+            if value is None:
+                continue
+            key = normalize_key(key)
+            column = f"{prefix}.{key}" if prefix else key
+            full_path = f"{table_path}.{column}" if table_path else column
+            if key == "@type":
+                items = value if isinstance(value, list) else [value]
+                row[column] = [normalize_key(item) if isinstance(item, str) else _to_text(item)
+                               for item in items if item is not None]
+                continue
+            if key in NUMERIC_KEYS and not isinstance(value, (dict, list)):
+                number = _to_number(value)
+                if number is None:
+                    row[column + TEXT_SUFFIX] = _to_text(value)
+                else:
+                    row[column] = number
+                continue
+            if isinstance(value, dict) and key not in self.child_keys:
+                self._flatten(value, column, row, table_path, root_id)
+                continue
+            items = value if isinstance(value, list) else [value]
+            objects = [item for item in items if isinstance(item, dict)]
+            if isinstance(value, list) or objects:
+                scalars = [_to_text(item) for item in items if not isinstance(item, (dict, type(None)))]
+                if scalars:
+                    row[column] = scalars
+                for index, item in enumerate(objects):
+                    child = self._new_row(self._child_table(full_path), {
+                        "_root_id": root_id,
+                        "_parent_id": row["_id"],
+                        "_index": index,
+                    })
+                    self._flatten(item, "", child, full_path, root_id)
+            else:
+                row[column] = value
+
+    def take(self, table):
+        rows = self.buffers.get(table, [])
+        self.buffers[table] = []
+        return rows
+
+
+# ----------------- 类型推断 -----------------
+def infer_schema(rows, base=None):
+    """在已有 schema 基础上合并本批行的列；同一列出现不同类型时退化为字符串。"""
+    fields = {f.name: f.type for f in base} if base is not None else {}
+    for row in rows:
+        for name, value in row.items():
+            new_type = META_TYPES.get(name) or KIND_TYPES[_kind(value)]
+            old_type = fields.get(name)
+            if old_type is None:
+                fields[name] = new_type
+            elif old_type != new_type:
+                fields[name] = pa.string()
+    return pa.schema(list(fields.items()))
+
+
+def build_table(rows, schema):
+    columns = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if field.type == pa.string():
+            values = [_to_text(v) for v in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# ----------------- Parquet 增量写入 -----------------
+class TableWriter:
+    """单张表的 Parquet 写入器。出现新列或类型变化时关闭当前分片，以合并后的 schema 开启新分片。"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.schema = None
+        self.writer = None
+        self.part = 0
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, rows):
+        if not rows:
+            return
+        schema = infer_schema(rows, self.schema)
+        if self.writer is None or not schema.equals(self.schema):
+            self.close()
+            path = os.path.join(self.directory, f"part-{self.part:05d}.parquet")
+            self.writer = pq.ParquetWriter(path, schema)
+            self.schema = schema
+            self.part += 1
+        self.writer.write_table(build_table(rows, self.schema))
+        self.rows += len(rows)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def flatten_to_parquet(documents, out_dir, row_group_size=ROW_GROUP_SIZE, child_keys=CHILD_KEYS):
+    """展平文档流并写入 out_dir/<表名>/part-*.parquet，返回各表行数。内存占用只与行组大小有关。
+    表名与原始路径的对应关系写入 out_dir/tables.json。"""
+    flattener = Flattener(child_keys)
+    writers = {}
+    os.makedirs(out_dir, exist_ok=True)
+
+    def flush(table):
+        if table not in writers:
+            writers[table] = TableWriter(table_dir(out_dir, table))
+        writers[table].write(flattener.take(table))
+
+    try:
+        for doc in documents:
+            flattener.add_document(doc)
+            for table, rows in flattener.buffers.items():
+                if len(rows) >= row_group_size:
+                    flush(table)
+        for table in list(flattener.buffers):
+            flush(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    with open(os.path.join(out_dir, "tables.json"), "w", encoding="utf-8") as f:
+        json.dump({table: flattener.tables[table] for table in sorted(writers)}, f, ensure_ascii=False, indent=2)
+    return {table: writer.rows for table, writer in writers.items()}
+
+
+# ----------------- 读取 -----------------
+def list_tables(out_dir):
+    return sorted(name for name in os.listdir(out_dir) if os.path.isdir(os.path.join(out_dir, name)))
+
+
+def read_table(out_dir, table=ENTITY_TABLE, columns=None):
+    """读取一张表的全部分片并对齐到最终 schema（最后一个分片的 schema 覆盖之前所有列），返回 DataFrame。
+    columns 中不存在的列以全空列返回，便于在字段可能缺失的语料上写固定的查询。"""
+    directory = table_dir(out_dir, table)
+    if not os.path.isdir(out_dir):
+        raise FileNotFoundError(f"输出目录不存在: {out_dir}")
+    parts = []
+    if os.path.isdir(directory):
+        parts = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".parquet"))
+    if not parts:
+        available = ", ".join(list_tables(out_dir)) or "无"
+        raise ValueError(f"表 {table!r} 不存在或没有数据，可用的表: {available}")
+    final = pq.read_schema(parts[-1])
+    if columns is not None:
+        final = pa.schema([final.field(name) if name in final.names else pa.field(name, pa.null())
+                           for name in columns])
+
+    tables = []
+    for part in parts:
+        names = pq.read_schema(part).names
+        t = pq.read_table(part, columns=[name for name in final.names if name in names])
+        arrays = []
+        for field in final:
+            if field.name not in t.column_names:
+                arrays.append(pa.nulls(t.num_rows, type=field.type))
+            elif t.schema.field(field.name).type != field.type:
+                # 早期分片中的列后来被合并为字符串
+                values = [_to_text(v) for v in t.column(field.name).to_pylist()]
+                arrays.append(pa.array(values, type=field.type))
+            else:
+                arrays.append(t.column(field.name))
+        tables.append(pa.Table.from_arrays(arrays, schema=final))
+    return pa.concat_tables(tables).to_pandas()
+
+
+# ----------------- 内存模式 -----------------
+def flatten_to_frames(documents, child_keys=CHILD_KEYS):
+    """小规模数据直接在内存中展平，返回 {表名: DataFrame}。"""
+    flattener = Flattener(child_keys)
+    for doc in documents:
+        flattener.add_document(doc)
+    frames = {}
+    for table in flattener.buffers:
+        rows = flattener.take(table)
+        frames[table] = build_table(rows, infer_schema(rows)).to_pandas()
+    return frames
+
+
+def has_type(frame, type_name, column="@type"):
+    """按 @type 筛选实体：返回布尔 Series，多类型实体（如 ["Product", "Thing"]）同样命中。"""
+    if column not in frame.columns:
+        return pd.Series(False, index=frame.index)
+    matched = frame[column].explode().eq(type_name)
+    return matched.groupby(level=0).any().reindex(frame.index, fill_value=False)
+
+
+def frame_to_parquet_bytes(frame):
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+# ----------------- 命令行 -----------------
+def main():
+    parser = argparse.ArgumentParser(description="将 JSON-LD 文档展平为 Parquet 列式表")
+    parser.add_argument("inputs", nargs="+", help="输入文件（.json 或 .jsonl）")
+    parser.add_argument("-o", "--out-dir", required=True, help="输出目录")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE, help="每个行组的行数")
+    args = parser.parse_args()
+
+    documents = (doc for path in args.inputs for doc in iter_documents(path))
+    counts = flatten_to_parquet(documents, args.out_dir, args.row_group_size)
+    for table, count in sorted(counts.items()):
+        print(f"{table}: {count} 行")
+
+
+if __name__ == "__main__":
+    main()
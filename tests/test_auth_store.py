@@ -0,0 +1,119 @@
+import hashlib
+import json
+
+import pytest
+
+from auth_store import MemoryBackend, SQLiteBackend, sign_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    # default_user_db() 会读取当前目录下的 users.json
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "sessions.db"))
+
+
+def test_sign_and_verify_token():
+    token = sign_token("secret", "abc")
+    assert verify_token("secret", token) == "abc"
+    assert verify_token("other", token) is None
+
+
+@pytest.mark.parametrize("token", ["", None, "abc", "a.b.c", "abc.!!!", "abc.", ".sig"])
+def test_verify_rejects_malformed_tokens(token):
+    assert verify_token("secret", token) is None
+
+
+def test_verify_rejects_tampered_tokens():
+    token = sign_token("secret", "abc")
+    session_id, sig = token.split(".")
+    assert verify_token("secret", f"abd.{sig}") is None
+    assert verify_token("secret", f"{session_id}.{sig[:-2]}AA") is None
+
+
+def test_default_user_seeded(backend):
+    users = backend.load_users()
+    assert users == {"Eric": {"password": hashlib.sha256(b"1314").hexdigest(), "is_admin": True}}
+
+
+def test_users_json_imported(tmp_path):
+    (tmp_path / "users.json").write_text(json.dumps({"bob": {"password": "h", "is_admin": False}}))
+    assert SQLiteBackend(str(tmp_path / "sessions.db")).load_users() == {"bob": {"password": "h", "is_admin": False}}
+
+
+def test_session_round_trip(backend):
+    token = backend.create_session("Eric")
+    assert backend.resolve_session(token) == "Eric"
+    assert backend.resolve_session(token[:-2] + "AA") is None
+    assert backend.resolve_session("not-a-token") is None
+
+
+def test_session_expires(backend):
+    token = backend.create_session("Eric", ttl=-1)
+    assert backend.resolve_session(token) is None
+
+
+def test_revoke_session(backend):
+    token = backend.create_session("Eric")
+    other = backend.create_session("Eric")
+    backend.revoke_session(token)
+    assert backend.resolve_session(token) is None
+    assert backend.resolve_session(other) == "Eric"
+
+
+def test_revoke_user_sessions(backend):
+    backend.put_user("bob", "h", False)
+    bob = backend.create_session("bob")
+    eric = backend.create_session("Eric")
+    backend.revoke_user_sessions("bob")
+    assert backend.resolve_session(bob) is None
+    assert backend.resolve_session(eric) == "Eric"
+    assert "bob" in backend.load_users()
+
+
+def test_delete_user_removes_sessions(backend):
+    backend.put_user("bob", "h", True)
+    token = backend.create_session("bob")
+    backend.delete_user("bob")
+    assert "bob" not in backend.load_users()
+    assert backend.resolve_session(token) is None
+
+
+def test_sqlite_backends_share_state(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    a = SQLiteBackend(path)
+    b = SQLiteBackend(path)
+    assert a.get_secret() == b.get_secret()
+
+    token = a.create_session("Eric")
+    assert b.resolve_session(token) == "Eric"
+
+    a.put_user("bob", "h", False)
+    assert b.load_users()["bob"] == {"password": "h", "is_admin": False}
+    b.put_user("bob", "h2", True)
+    assert a.load_users()["bob"] == {"password": "h2", "is_admin": True}
+
+    bob = b.create_session("bob")
+    a.revoke_user_sessions("bob")
+    assert b.resolve_session(bob) is None
+
+    b.revoke_session(token)
+    assert a.resolve_session(token) is None
+
+    bob = a.create_session("bob")
+    b.delete_user("bob")
+    assert "bob" not in a.load_users()
+    assert a.resolve_session(bob) is None
+
+
+def test_explicit_secret_overrides_stored(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    token = SQLiteBackend(path, secret="s1").create_session("Eric")
+    assert SQLiteBackend(path, secret="s1").resolve_session(token) == "Eric"
+    assert SQLiteBackend(path, secret="s2").resolve_session(token) is None
@@ -0,0 +1,124 @@
+import json
+
+import pandas as pd
+import pytest
+
+from jsonld_flatten import flatten_to_frames, flatten_to_parquet, read_table, list_tables, has_type
+
+DOCS = [
+    {"@type": "Product", "name": "A", "offers": {"price": 20, "priceCurrency": "USD"}},
+    {"@type": "Product", "name": "B", "offers": {"price": "19.99", "priceCurrency": "EUR"}},
+    {"@type": "Product", "name": "C", "sku": 7, "offers": [{"price": 5.5}, {"price": "call us"}]},
+    {"@graph": [
+        {"@type": "FAQPage", "mainEntity": [{"@type": "Question", "name": "q", "acceptedAnswer": {"text": "a"}}]},
+        {"@type": "Thing", "sku": "X-1", "image": ["a.jpg", "b.jpg"]},
+    ]},
+    {"@type": "Thing", "image": "c.jpg", "flag": True},
+]
+
+
+@pytest.mark.parametrize("row_group_size", [1, 2, 1000])
+def test_parquet_round_trip_matches_in_memory(tmp_path, row_group_size):
+    expected = flatten_to_frames(DOCS)
+    flatten_to_parquet(DOCS, str(tmp_path), row_group_size=row_group_size)
+
+    assert list_tables(str(tmp_path)) == sorted(expected)
+    for table, frame in expected.items():
+        pd.testing.assert_frame_equal(read_table(str(tmp_path), table), frame)
+
+
+def test_mixed_number_and_string_keep_json_text():
+    entities = flatten_to_frames(DOCS)["entities"]
+    assert entities["sku"].dropna().tolist() == ["7", "X-1"]
+
+
+def test_numeric_fields_parse_strings():
+    offers = flatten_to_frames(DOCS)["offers"]
+    assert offers["price"].dtype == "float64"
+    assert offers["price"].tolist()[:3] == [20.0, 19.99, 5.5]
+    assert pd.isna(offers["price"].iloc[3])
+    assert offers["price#text"].tolist()[3] == "call us"
+
+
+def test_type_is_always_a_list():
+    entities = flatten_to_frames(DOCS + [{"@type": ["Product", "Thing"], "name": "D"}])["entities"]
+    assert entities.loc[has_type(entities, "Product"), "name"].tolist() == ["A", "B", "C", "D"]
+    assert has_type(entities, "Thing").sum() == 3
+
+
+def test_schema_prefixes_and_iris_are_normalized(tmp_path):
+    docs = [
+        {"@type": "Product", "name": "A", "offers": {"price": "1"}},
+        {"@type": "schema:Product", "schema:name": "B", "schema:offers": {"schema:price": "2"}},
+        {"@type": "http://schema.org/Product", "http://schema.org/name": "C",
+         "https://schema.org/offers": [{"http://schema.org/price": 3}],
+         "http://example.com/parts": [{"name": "x"}]},
+    ]
+    frames = flatten_to_frames(docs)
+    assert sorted(frames) == ["entities", "http___example.com_parts", "offers"]
+    assert frames["entities"]["name"].tolist() == ["A", "B", "C"]
+    assert has_type(frames["entities"], "Product").all()
+    assert frames["offers"]["price"].tolist() == [1.0, 2.0, 3.0]
+
+    flatten_to_parquet(docs, str(tmp_path))
+    assert list_tables(str(tmp_path)) == sorted(frames)
+    pd.testing.assert_frame_equal(read_table(str(tmp_path), "http___example.com_parts"),
+                                  frames["http___example.com_parts"])
+
+
+@pytest.mark.parametrize("key", [".", "..", "", "../x", "..\\x"])
+def test_table_names_stay_inside_out_dir(tmp_path, key):
+    out_dir = tmp_path / "out"
+    counts = flatten_to_parquet([{key: [{"name": "x"}]}], str(out_dir))
+    assert list(tmp_path.iterdir()) == [out_dir]
+    assert sorted(counts) == list_tables(str(out_dir))
+    for table in counts:
+        assert read_table(str(out_dir), table)["_id"].tolist() == [0]
+
+
+def test_read_table_rejects_paths(tmp_path):
+    flatten_to_parquet(DOCS, str(tmp_path / "out"))
+    with pytest.raises(ValueError):
+        read_table(str(tmp_path / "out"), "../out/entities")
+
+
+def test_child_tables_do_not_merge(tmp_path):
+    docs = [
+        {"name": "root", "entities": [{"name": "child"}]},
+        {"a/b": [{"x": 1}], "a:b": [{"x": 2}], "Offers": [{"price": 3}], "offers": {"price": 4}},
+    ]
+    frames = flatten_to_frames(docs)
+    assert frames["entities"]["name"].tolist() == ["root", None]
+    assert frames["entities"]["_doc"].dtype == "int64"
+    assert frames["entities__2"]["name"].tolist() == ["child"]
+    assert frames["a_b"]["x"].tolist() == [1.0]
+    assert frames["a_b__2"]["x"].tolist() == [2.0]
+    assert frames["Offers"]["price"].tolist() == [3.0]
+    assert frames["offers__2"]["price"].tolist() == [4.0]
+
+    flatten_to_parquet(docs, str(tmp_path))
+    assert list_tables(str(tmp_path)) == sorted(frames)
+    with open(tmp_path / "tables.json", encoding="utf-8") as f:
+        assert json.load(f)["a_b__2"] == "a:b"
+
+
+def test_missing_columns(tmp_path):
+    entities = flatten_to_frames([{"name": "a"}])["entities"]
+    assert has_type(entities, "Product").tolist() == [False]
+
+    flatten_to_parquet([{"offers": {"priceCurrency": "USD"}}], str(tmp_path))
+    offers = read_table(str(tmp_path), "offers", columns=["_root_id", "price", "priceCurrency"])
+    assert offers.columns.tolist() == ["_root_id", "price", "priceCurrency"]
+    assert offers.dropna(subset=["price"]).empty
+    assert offers["priceCurrency"].tolist() == ["USD"]
+    assert read_table(str(tmp_path), "offers", columns=["price"]).shape == (1, 1)
+
+
+def test_read_table_unknown_table(tmp_path):
+    flatten_to_parquet(DOCS, str(tmp_path))
+    (tmp_path / "empty").mkdir()
+    for table in ("missing", "empty"):
+        with pytest.raises(ValueError, match=f"{table}.*entities, mainEntity, offers"):
+            read_table(str(tmp_path), table)
+    with pytest.raises(FileNotFoundError):
+        read_table(str(tmp_path / "nowhere"))